@@ -1,7 +1,20 @@
+from smtplib import SMTPException
+
 from django.core.mail import send_mail
 from django.conf import settings
 from celery import shared_task
 
-@shared_task
+@shared_task(autoretry_for=(SMTPException,), retry_backoff=True, max_retries=5)
 def Celery_send_mail(email, message, subject):
-      send_mail(subject, message, settings.DEFAULT_FROM_EMAIL, [email])
\ No newline at end of file
+      send_mail(subject, message, settings.DEFAULT_FROM_EMAIL, [email])
+
+
+@shared_task
+def hash_and_set_password(user_id, raw_password):
+      # Run the (deliberately slow) password hasher on the worker pool
+      # instead of the request thread
+      from .models import CustomUser
+
+      user = CustomUser.objects.only('id', 'password').get(pk=user_id)
+      user.set_password(raw_password)
+      user.save(update_fields=['password'])
\ No newline at end of file
@@ -1,6 +1,7 @@
 import random
 import uuid
 from datetime import timedelta
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
 from django.core.mail import send_mail
@@ -38,6 +39,11 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
     full_name = models.CharField(max_length=150, blank=True, null=True)
     phone_number = models.CharField(max_length=20, blank=True, null=True)
     profile_picture = models.ImageField(upload_to='profile_pics/', blank=True, null=True)
+    referral_code = models.CharField(max_length=12, unique=True, blank=True, null=True)
+    referred_by = models.CharField(max_length=12, blank=True, null=True, db_index=True)
+    favorite_item = models.PositiveIntegerField(default=0)
+    is_unlimited = models.BooleanField(default=False)
+    package_expiry = models.DateTimeField(blank=True, null=True)
     is_active = models.BooleanField(default=False)
     is_staff = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -48,6 +54,15 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['full_name', 'phone_number']
 
+    def save(self, *args, **kwargs):
+        if not self.referral_code:
+            self.referral_code = uuid.uuid4().hex[:12]
+        super().save(*args, **kwargs)
+
+    @property
+    def my_referral_link(self):
+        return f"{settings.SITE_URL}/register/{self.referral_code}/"
+
     def __str__(self):
         return self.full_name or self.email or f"User {self.pk}"
 
@@ -69,6 +84,11 @@ class PasswordResetCode(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     is_used = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'code', 'is_used']),
+        ]
+
     def save(self, *args, **kwargs):
         if not self.code:
             self.code = f"{random.randint(100000, 999999)}"
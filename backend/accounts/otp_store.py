@@ -0,0 +1,29 @@
+import hmac
+import secrets
+
+from django.core.cache import cache
+
+# Matches the two-minute window PasswordResetCode.is_expired() enforced
+OTP_TTL = 120
+
+
+def _key(user_id):
+    return f"otp:{user_id}"
+
+
+def issue(user):
+    """Generate a six-digit code for the user and store it with a TTL."""
+    code = f"{secrets.randbelow(1_000_000):06d}"
+    cache.set(_key(user.pk), code, OTP_TTL)
+    return code
+
+
+def check(user, code):
+    """Return True if the submitted code matches the stored one."""
+    stored = cache.get(_key(user.pk))
+    return stored is not None and hmac.compare_digest(str(stored), str(code))
+
+
+def clear(user):
+    """Consume the user's code so it cannot be replayed."""
+    cache.delete(_key(user.pk))
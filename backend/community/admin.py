@@ -1,4 +1,5 @@
 from django.contrib import admin
+from django.db.models import Count
 from .models import Prayer, PrayerLike, PrayerComment
 
 
@@ -10,9 +11,28 @@ class PrayerAdmin(admin.ModelAdmin):
     readonly_fields = ('create_at', 'updated_at', 'total_likes', 'total_comments')
     list_editable = ('is_active',)
     ordering = ('-create_at',)
-    
+    list_select_related = ('user',)
+
+    def get_queryset(self, request):
+        # One JOIN + GROUP BY instead of two COUNT queries per changelist row;
+        # the preview column reads post_excerpt, so skip the big TextField
+        return super().get_queryset(request).defer('post').annotate(
+            _likes=Count('likes', distinct=True),
+            _comments=Count('comments', distinct=True),
+        )
+
+    def total_likes(self, obj):
+        return obj._likes
+    total_likes.admin_order_field = '_likes'
+    total_likes.short_description = 'Total Likes'
+
+    def total_comments(self, obj):
+        return obj._comments
+    total_comments.admin_order_field = '_comments'
+    total_comments.short_description = 'Total Comments'
+
     def post_preview(self, obj):
-        return obj.post[:100] + '...' if len(obj.post) > 100 else obj.post
+        return obj.post_excerpt
     post_preview.short_description = 'Post Preview'
 
 
@@ -23,9 +43,14 @@ class PrayerLikeAdmin(admin.ModelAdmin):
     search_fields = ('user__email', 'user__first_name', 'user__last_name', 'prayer__post')
     readonly_fields = ('created_at',)
     ordering = ('-created_at',)
-    
+    def get_queryset(self, request):
+        # Deferring the joined TextField needs the select_related on the
+        # same queryset, so this replaces list_select_related here
+        return super().get_queryset(request).select_related('user', 'prayer').defer('prayer__post')
+
     def prayer_preview(self, obj):
-        return obj.prayer.post[:50] + '...' if len(obj.prayer.post) > 50 else obj.prayer.post
+        excerpt = obj.prayer.post_excerpt
+        return excerpt[:50] + '...' if len(excerpt) > 50 else excerpt
     prayer_preview.short_description = 'Prayer'
 
 
@@ -36,9 +61,12 @@ class PrayerCommentAdmin(admin.ModelAdmin):
     search_fields = ('user__email', 'user__first_name', 'user__last_name', 'prayer__post', 'comment')
     readonly_fields = ('created_at',)
     ordering = ('-created_at',)
-    
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('user', 'prayer').defer('prayer__post')
+
     def prayer_preview(self, obj):
-        return obj.prayer.post[:30] + '...' if len(obj.prayer.post) > 30 else obj.prayer.post
+        excerpt = obj.prayer.post_excerpt
+        return excerpt[:30] + '...' if len(excerpt) > 30 else excerpt
     prayer_preview.short_description = 'Prayer'
     
     def comment_preview(self, obj):
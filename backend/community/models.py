@@ -6,6 +6,7 @@ User = get_user_model()
 class Prayer(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='prayers')
     post = models.TextField(blank=True, null=True)
+    post_excerpt = models.CharField(max_length=110, blank=True, default='')
     image = models.ImageField(upload_to='prayer_images/', null=True, blank=True)
     video = models.FileField(upload_to='prayer_videos/', null=True, blank=True)
     create_at = models.DateTimeField(auto_now_add=True)
@@ -13,18 +14,24 @@ class Prayer(models.Model):
     is_active = models.BooleanField(default=True)
     
     def total_likes(self):
-        return self.likes.count()
+        # Served from the admin queryset annotation when present
+        likes = getattr(self, '_likes', None)
+        return likes if likes is not None else self.likes.count()
 
     def total_comments(self):
-        return self.comments.count()
+        comments = getattr(self, '_comments', None)
+        return comments if comments is not None else self.comments.count()
 
-    def __str__(self):
-        title = ""
+    def save(self, *args, **kwargs):
+        # Keep a short inline excerpt so previews never detoast the full text
         if self.post:
-            title = (self.post[:47] + '...') if len(self.post) > 50 else self.post
+            self.post_excerpt = (self.post[:97] + '...') if len(self.post) > 100 else self.post
         else:
-            title = f"Prayer {self.id}"
-        return title
+            self.post_excerpt = ''
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return self.post_excerpt[:50] or f"Prayer {self.id}"
 
 
 class PrayerLike(models.Model):
@@ -0,0 +1,44 @@
+from django.core.cache import cache
+
+from .models import Plan
+
+PLAN_CACHE_TTL = 300
+
+
+def _plan_key(plan_id):
+    return f"plan:active:{plan_id}"
+
+
+def get_active_plan(plan_id):
+    """Return an active Plan by id, served from the shared cache.
+
+    Plans change minutes-to-days apart, so a 5 minute TTL turns the
+    per-checkout `Plan.objects.get` into a Redis hash lookup. Raises
+    Plan.DoesNotExist just like the direct query.
+    """
+    key = _plan_key(plan_id)
+    plan = cache.get(key)
+    if plan is None:
+        plan = Plan.objects.get(pk=plan_id, active=True)
+        cache.set(key, plan, PLAN_CACHE_TTL)
+    return plan
+
+
+def invalidate_plan(plan_id):
+    cache.delete(_plan_key(plan_id))
+
+
+PLAN_LIST_TTL = 3600
+
+
+def get_cached_plan_list(cache_key, build):
+    """Serve a serialized plan list payload from the cache.
+
+    Both plan list views use the same read-through shape; the Plan
+    save/delete signals drop the keys, so the TTL is just a backstop.
+    """
+    data = cache.get(cache_key)
+    if data is None:
+        data = build()
+        cache.set(cache_key, data, PLAN_LIST_TTL)
+    return data
@@ -1,4 +1,10 @@
+import datetime
+import time
+
+from django.core.cache import cache
 from django.db import models
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
@@ -13,18 +19,45 @@ class Plan(models.Model):
     name = models.CharField(max_length=50, unique=True)
     stripe_product_id = models.CharField(max_length=255, blank=True, null=True)  
     stripe_price_id = models.CharField(max_length=255, blank=True, null=True)
-    amount = models.PositiveIntegerField(default=0, help_text="Amount in cents")  
+    # Stripe product/price creation happens on a worker; plans are only
+    # sellable once the sync lands ("active")
+    sync_status = models.CharField(
+        max_length=20,
+        default="active",
+        choices=[
+            ("pending", "Pending"),
+            ("active", "Active"),
+            ("failed", "Failed"),
+        ],
+    )
+    amount = models.PositiveIntegerField(default=0, help_text="Amount in cents")
     interval = models.CharField(max_length=20, choices=Interval_choices, default="month")
     interval_count = models.PositiveIntegerField(default=1)
     description = models.TextField(blank=True, null=True)
     trial_days = models.PositiveIntegerField(default=0)
     active = models.BooleanField(default=True)
-    
+    # Display values derived from amount/interval_count, recomputed in
+    # save() so serialization is a plain column read
+    amount_dollars = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    total_cost = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    price_display = models.CharField(max_length=50, blank=True, default="")
+
     class Meta:
         ordering = ['amount']
         verbose_name = "Subscription Plan"
         verbose_name_plural = "Subscription Plans"
 
+    def save(self, *args, **kwargs):
+        self.amount_dollars = round(self.amount / 100, 2)
+        self.total_cost = round(self.amount_dollars * self.interval_count, 2)
+        self.price_display = f"$ {self.amount / 100}/month"
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = list(update_fields) + [
+                'amount_dollars', 'total_cost', 'price_display',
+            ]
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return (
             f"{self.name} "
@@ -40,6 +73,19 @@ class Plan(models.Model):
 
 
 
+class SubscriptionManager(models.Manager):
+    def trialing_now(self):
+        """Subscriptions currently inside their trial window.
+
+        Same comparison as is_trial(), but done in SQL against the raw
+        trial_end_ts int so bulk trial queries stay on the index.
+        """
+        return self.filter(
+            status__in=['trialing', 'active'],
+            trial_end_ts__gt=int(time.time()),
+        )
+
+
 class Subscription(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="subscriptions")
     plan = models.ForeignKey(Plan, on_delete=models.SET_NULL, null=True)
@@ -57,23 +103,51 @@ class Subscription(models.Model):
             ("unpaid", "Unpaid")
         ]
     )  # pending → trialing → active → canceled
-    trial_end = models.DateTimeField(blank=True, null=True)
-    current_period_end = models.DateTimeField(blank=True, null=True)
+    # Raw Stripe Unix timestamps; the webhook path writes these directly
+    # and the trial_end/current_period_end properties convert on read
+    trial_end_ts = models.BigIntegerField(blank=True, null=True)
+    current_period_end_ts = models.BigIntegerField(blank=True, null=True)
     auto_renew = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = SubscriptionManager()
+
+    class Meta:
+        indexes = [
+            # Covers the pending-subscription lookup in the webhook handlers
+            models.Index(fields=['user', 'stripe_customer_id', 'status'], name='sub_pending_lookup_idx'),
+            models.Index(fields=['stripe_subscription_id'], name='sub_stripe_sub_id_idx'),
+            # Admin subscription list filters on status
+            models.Index(fields=['status'], name='sub_status_idx'),
+            # Covers the per-request get_user_active_subscription lookup
+            models.Index(fields=['user', 'status'], name='sub_user_status_idx'),
+            # trialing_now() range-filters on the raw timestamp
+            models.Index(fields=['trial_end_ts'], name='sub_trial_end_ts_idx'),
+        ]
+
+    @property
+    def trial_end(self):
+        if self.trial_end_ts is None:
+            return None
+        return datetime.datetime.fromtimestamp(self.trial_end_ts, tz=datetime.timezone.utc)
+
+    @property
+    def current_period_end(self):
+        if self.current_period_end_ts is None:
+            return None
+        return datetime.datetime.fromtimestamp(self.current_period_end_ts, tz=datetime.timezone.utc)
+
     def is_active(self):
         return self.status in ["active"]
 
     def is_trial(self):
         """Check if subscription is in trial period"""
-        from django.utils import timezone
-        if not self.trial_end:
+        if not self.trial_end_ts:
             return False
         return (
-            self.status in ["trialing", "active"] and 
-            self.trial_end > timezone.now()
+            self.status in ["trialing", "active"] and
+            self.trial_end_ts > time.time()
         )
 
 
@@ -85,13 +159,30 @@ class Subscription(models.Model):
         return self.status == "trialing"
 
     @classmethod
-    def get_user_active_subscription(cls, user):
-        """Get user's active subscription active or on trial"""
-        return cls.objects.filter(
-            user=user, 
+    def get_user_active_subscription(cls, user, request=None):
+        """Get user's active subscription active or on trial
+
+        Pass the request to memoize the result for its lifetime, so the
+        permission class and the view body share one SELECT.
+        """
+        if request is not None and hasattr(request, '_active_subscription'):
+            return request._active_subscription
+
+        # Callers read subscription.plan.name right after, so join it
+        # here; .only() trims the row to the columns the checkout,
+        # permission and auto-renew paths actually touch
+        subscription = cls.objects.select_related('plan').only(
+            'id', 'plan', 'status', 'auto_renew', 'stripe_subscription_id',
+            'trial_end_ts', 'current_period_end_ts',
+        ).filter(
+            user=user,
             status__in=['active', 'trialing']
         ).first()
 
+        if request is not None:
+            request._active_subscription = subscription
+        return subscription
+
     def __str__(self):
         return f"{self.user} - {self.plan.name if self.plan else 'N/A'} ({self.status})"
 
@@ -102,6 +193,17 @@ class WebhookEvent(models.Model):
     type = models.CharField(max_length=255)
     data = models.JSONField()
     received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(blank=True, null=True)
 
     def __str__(self):
         return f"{self.type} - {self.event_id}"
+
+
+PLAN_LIST_CACHE_KEY = "plans:v1"
+ACTIVE_PLAN_LIST_CACHE_KEY = "plans:active:v1"
+
+
+@receiver([post_save, post_delete], sender=Plan)
+def invalidate_plan_list_cache(sender, **kwargs):
+    # Plans change rarely; drop both cached lists on any write
+    cache.delete_many([PLAN_LIST_CACHE_KEY, ACTIVE_PLAN_LIST_CACHE_KEY])
@@ -21,8 +21,10 @@ class HasActiveSubscription(permissions.BasePermission):
         if not user.is_authenticated:
             return False
 
-        # Use your Subscription model method
-        active_subscription = Subscription.get_user_active_subscription(user)
+        # Request-memoized (see get_user_active_subscription): composed
+        # permission stacks and the view body share one SELECT, including
+        # the negative "no subscription" result
+        active_subscription = Subscription.get_user_active_subscription(user, request=request)
         if active_subscription:
             return True
 
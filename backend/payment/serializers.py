@@ -6,25 +6,19 @@ from django.contrib.auth import get_user_model
 User = get_user_model()
 
 class PlanSerializer(serializers.ModelSerializer):
+    # Precomputed in Plan.save(); float keeps the payload shape the old
+    # per-request math produced
+    total_cost = serializers.FloatField(read_only=True)
+
     class Meta:
         model = Plan
         fields = "__all__"
         read_only_fields = ("stripe_price_id","stripe_product_id")
-        
+
     def to_representation(self, instance):
         representation = super().to_representation(instance)
-        
-        # Convert amount from cents to dollars
-        monthly_amount = float(instance.amount) / 100
-        representation['amount'] = monthly_amount
-        
-        # Calculate total cost based on interval_count
-        total_cost = monthly_amount * instance.interval_count
-        representation['total_cost'] = round(total_cost, 2)
-        
-        # Build price_display string
-        representation['price_display'] = f"$ {monthly_amount}/month"
-        
+        # Public shape reports amount in dollars (cents stay internal)
+        representation['amount'] = float(instance.amount_dollars)
         return representation
         
 class PlanUpdateSerializer(serializers.ModelSerializer):
@@ -34,29 +28,34 @@ class PlanUpdateSerializer(serializers.ModelSerializer):
 
 class SubscriptionSerializer(serializers.ModelSerializer):
     plan = PlanSerializer(read_only=True)
+    # Model properties over the raw *_ts columns
+    trial_end = serializers.DateTimeField(read_only=True)
+    current_period_end = serializers.DateTimeField(read_only=True)
 
     class Meta:
         model = Subscription
-        fields = "__all__"
+        exclude = ("trial_end_ts", "current_period_end_ts")
         read_only_fields = (
             "user",
             "stripe_customer_id",
             "stripe_subscription_id",
             "status",
             "auto_renew",
-            "trial_end",
-            "current_period_end",
             "created_at",
             "updated_at",
         )
         
     def to_representation(self, instance):
         representation = super().to_representation(instance)
-        representation['user'] = User.objects.get(id=instance.user.id).full_name
+        # instance.user is already loaded (views select_related it) — a
+        # User.objects.get here would re-fetch the same row
+        representation['user'] = instance.user.full_name
         return representation
 
 
 class SubscriptionListSerializer(serializers.ModelSerializer):
+    trial_end = serializers.DateTimeField(read_only=True)
+    current_period_end = serializers.DateTimeField(read_only=True)
 
     class Meta:
         model = Subscription
@@ -67,8 +66,6 @@ class SubscriptionListSerializer(serializers.ModelSerializer):
             "stripe_subscription_id",
             "status",
             "auto_renew",
-            "trial_end",
-            "current_period_end",
             "created_at",
             "updated_at",
         )
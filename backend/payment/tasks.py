@@ -0,0 +1,415 @@
+import stripe
+import json
+import logging
+
+import redis
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from celery import shared_task
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Plan, Subscription, WebhookEvent
+
+logger = logging.getLogger(__name__)
+
+stripe.api_key = settings.STRIPE_SECRET_KEY
+
+# One shared HTTP client so Stripe calls reuse TCP/TLS connections
+# instead of handshaking per request; retries cover transient network
+# errors (idempotent under Stripe's idempotency keys). The session gets
+# an explicit adapter so webhook-worker bursts don't exhaust the default
+# 10-connection pool
+_stripe_session = requests.Session()
+_stripe_adapter = HTTPAdapter(
+    pool_connections=20,
+    pool_maxsize=50,
+    max_retries=Retry(total=3, backoff_factor=0.3),
+)
+_stripe_session.mount("https://", _stripe_adapter)
+stripe.default_http_client = stripe.http_client.RequestsClient(
+    timeout=10, session=_stripe_session
+)
+stripe.max_network_retries = 2
+
+
+@shared_task(bind=True, autoretry_for=(stripe.error.APIConnectionError,), retry_backoff=True, max_retries=3)
+def create_stripe_checkout(self, subscription_id, success_url, cancel_url):
+    """Create the Stripe customer + checkout session off the request thread.
+
+    The view already validated the plan and inserted the pending
+    Subscription row; this task only talks to Stripe and fills in the
+    customer id. The result (checkout_url) is polled via the task id.
+    """
+    subscription = Subscription.objects.select_related('user', 'plan').get(pk=subscription_id)
+    user = subscription.user
+    plan = subscription.plan
+
+    # Reuse the stored customer id directly — no stripe.Customer.retrieve
+    # round-trip just to pass the same id back to checkout
+    existing_sub = (
+        Subscription.objects.filter(user=user)
+        .exclude(stripe_customer_id=None)
+        .exclude(pk=subscription.pk)
+        .only('id', 'stripe_customer_id')
+        .first()
+    )
+
+    if existing_sub and existing_sub.stripe_customer_id:
+        customer_id = existing_sub.stripe_customer_id
+    else:
+        customer = stripe.Customer.create(
+            email=user.email,
+            name=getattr(user, "full_name", None) or user.email,
+            metadata={
+                "user_id": user.id,
+                "plan_id": plan.id
+            }
+        )
+        customer_id = customer.id
+
+    subscription_data = {
+        "metadata": {
+            "user_id": user.id,
+            "plan_id": plan.id,
+        }
+    }
+
+    # Only add trial if it's > 0
+    if plan.trial_days and plan.trial_days > 0:
+        subscription_data["trial_period_days"] = plan.trial_days
+
+    checkout_session = stripe.checkout.Session.create(
+        customer=customer_id,
+        payment_method_types=['card'],
+        line_items=[{
+            'price': plan.stripe_price_id,
+            'quantity': 1,
+        }],
+        mode='subscription',
+        success_url=success_url + '?session_id={CHECKOUT_SESSION_ID}',
+        cancel_url=cancel_url,
+        subscription_data=subscription_data,
+        metadata={
+            'user_id': user.id,
+            'plan_id': plan.id,
+        },
+        automatic_tax={'enabled': False},  # Optional
+        allow_promotion_codes=True,
+    )
+
+    Subscription.objects.filter(pk=subscription.pk).update(stripe_customer_id=customer_id)
+
+    return {
+        "checkout_url": checkout_session.url,
+        "checkout_session_id": checkout_session.id,
+        "subscription_id": subscription.id,
+    }
+
+
+@shared_task(bind=True, max_retries=3, retry_backoff=True)
+def process_stripe_event(self, event_id):
+    """Run the webhook event handlers off the request thread.
+
+    The view only verifies the signature and stores the event; this task
+    re-loads the row, locks it (skip_locked so concurrent retries don't
+    pile up) and dedupes via processed_at.
+    """
+    with transaction.atomic():
+        queryset = WebhookEvent.objects.filter(event_id=event_id, processed_at=None)
+        if connection.features.has_select_for_update:
+            queryset = queryset.select_for_update(skip_locked=True)
+        webhook_event = queryset.first()
+
+        if webhook_event is None:
+            logger.info(f"Webhook event {event_id} already processed or locked, skipping")
+            return
+
+        _handle_stripe_event(webhook_event.type, webhook_event.data)
+
+        webhook_event.processed_at = timezone.now()
+        webhook_event.save(update_fields=['processed_at'])
+
+
+def _handle_stripe_event(event_type, obj):
+    # Late import: views imports this module at load time
+    from .views import calculate_current_period_end
+
+    logger.info(f"Processing webhook event: {event_type}")
+
+    if event_type == "checkout.session.completed":
+        # Get user from metadata
+        metadata = obj.get("metadata", {})
+        user_id = metadata.get("user_id")
+
+        if user_id and obj.get("subscription"):
+            try:
+                # Retrieve the subscription from Stripe
+                stripe_subscription = stripe.Subscription.retrieve(obj["subscription"])
+
+                # Find the pending subscription by user_id and customer_id instead of stripe_subscription_id
+                # (covered by sub_pending_lookup_idx; only pull the columns we touch,
+                # plus the plan/user rows the handler reads afterwards)
+                subscription = Subscription.objects.select_related('plan', 'user').only(
+                    'id', 'user', 'plan', 'stripe_subscription_id',
+                    'status', 'trial_end_ts', 'current_period_end_ts', 'created_at',
+                ).filter(
+                    user_id=user_id,
+                    stripe_customer_id=obj.get("customer"),
+                    status="pending"
+                ).first()
+
+                if subscription:
+                    # Store the raw Stripe Unix timestamps; conversion to
+                    # datetimes happens lazily on read
+                    trial_end_ts = getattr(stripe_subscription, 'trial_end', None) or None
+                    current_period_end_ts = getattr(stripe_subscription, 'current_period_end', None) or None
+
+                    if current_period_end_ts is None and subscription.plan:
+                        # Fallback: calculate based on plan if Stripe doesn't provide it
+                        current_period_end_ts = int(calculate_current_period_end(
+                            subscription.plan,
+                            subscription.created_at
+                        ).timestamp())
+
+                    subscription.stripe_subscription_id = stripe_subscription.id
+                    subscription.status = stripe_subscription.status
+                    subscription.trial_end_ts = trial_end_ts
+                    subscription.current_period_end_ts = current_period_end_ts
+                    subscription.save(update_fields=[
+                        'stripe_subscription_id', 'status',
+                        'trial_end_ts', 'current_period_end_ts', 'updated_at',
+                    ])
+
+                    logger.info(f"Updated subscription {subscription.id} with Stripe data")
+
+                    # Referral benefits run in their own task, and only once
+                    # the surrounding transaction has committed
+                    transaction.on_commit(
+                        lambda: process_referral_benefits_task.delay(subscription.id)
+                    )
+                else:
+                    logger.warning(f"No pending subscription found for user {user_id} and customer {obj.get('customer')}")
+            except Exception as e:
+                logger.error(f"Error processing checkout.session.completed: {str(e)}")
+
+    elif event_type == "customer.subscription.created":
+        try:
+            # One indexed lookup: match on the Stripe subscription id or fall
+            # back to the pending row for this customer
+            subscription = Subscription.objects.only(
+                'id', 'user_id', 'plan_id', 'stripe_subscription_id',
+                'status', 'trial_end_ts', 'current_period_end_ts', 'created_at',
+            ).filter(
+                Q(stripe_subscription_id=obj["id"])
+                | Q(stripe_customer_id=obj.get("customer"), status="pending")
+            ).first()
+
+            if subscription:
+                # Update existing subscription with the raw timestamps
+                subscription.stripe_subscription_id = obj["id"]
+                subscription.status = obj["status"]
+                subscription.trial_end_ts = obj.get("trial_end")
+                subscription.current_period_end_ts = obj.get("current_period_end")
+                subscription.save(update_fields=[
+                    'stripe_subscription_id', 'status',
+                    'trial_end_ts', 'current_period_end_ts', 'updated_at',
+                ])
+
+                logger.info(f"Updated existing subscription {subscription.id} with Stripe ID: {obj['id']}")
+            else:
+                logger.warning(f"No matching subscription found for Stripe subscription {obj['id']}")
+        except Exception as e:
+            logger.error(f"Error processing customer.subscription.created: {str(e)}")
+
+    # ✅ Handle subscription updated
+    elif event_type == "customer.subscription.updated":
+        try:
+            updated_count = Subscription.objects.filter(
+                stripe_subscription_id=obj["id"]
+            ).update(
+                status=obj["status"],
+                trial_end_ts=obj.get("trial_end"),
+                current_period_end_ts=obj.get("current_period_end"),
+            )
+
+            logger.info(f"Updated {updated_count} subscriptions for Stripe ID: {obj['id']}")
+        except Exception as e:
+            logger.error(f"Error processing customer.subscription.updated: {str(e)}")
+
+    # ✅ Handle subscription deleted/cancelled
+    elif event_type == "customer.subscription.deleted":
+        try:
+            updated_count = Subscription.objects.filter(
+                stripe_subscription_id=obj["id"]
+            ).update(status="canceled")
+
+            logger.info(f"Canceled {updated_count} subscriptions for Stripe ID: {obj['id']}")
+        except Exception as e:
+            logger.error(f"Error processing customer.subscription.deleted: {str(e)}")
+
+    else:
+        logger.info(f"Unhandled webhook event type: {event_type}")
+
+
+@shared_task(bind=True, max_retries=3, retry_backoff=True)
+def process_referral_benefits_task(self, subscription_id):
+    """Grant referral benefits after a subscription purchase commits."""
+    from .views import process_referral_benefits
+
+    subscription = Subscription.objects.select_related('plan', 'user').get(pk=subscription_id)
+    process_referral_benefits(subscription.user, subscription)
+
+
+# Replay bursts for these event types are drained in batches instead of
+# one Celery task per event
+BATCHED_EVENT_TYPES = ("customer.subscription.updated", "customer.subscription.deleted")
+
+STRIPE_EVENTS_LIST_KEY = "stripe:events"
+
+_redis_client = None
+
+
+def get_redis_client():
+    global _redis_client
+    if _redis_client is None:
+        _redis_client = redis.Redis.from_url(settings.CELERY_BROKER_URL)
+    return _redis_client
+
+
+@shared_task
+def drain_stripe_events(batch_size=500):
+    """Drain batched webhook payloads pushed to Redis by the view.
+
+    Runs on the beat schedule every few seconds. Pops up to batch_size
+    payloads atomically, records them with one bulk_create
+    (ignore_conflicts dedupes redeliveries) and runs the handlers.
+    """
+    client = get_redis_client()
+    with client.pipeline() as pipe:
+        pipe.lrange(STRIPE_EVENTS_LIST_KEY, 0, batch_size - 1)
+        pipe.ltrim(STRIPE_EVENTS_LIST_KEY, batch_size, -1)
+        payloads, _ = pipe.execute()
+
+    if not payloads:
+        return 0
+
+    events = [json.loads(payload) for payload in payloads]
+
+    WebhookEvent.objects.bulk_create(
+        [
+            WebhookEvent(
+                event_id=event["id"],
+                type=event["type"],
+                data=event["data"]["object"],
+            )
+            for event in events
+        ],
+        ignore_conflicts=True,
+    )
+
+    # Collapse the batch to one state per Stripe subscription id —
+    # last delivery wins, and a delete beats any update
+    updates = {}
+    deleted_ids = set()
+    for event in events:
+        obj = event["data"]["object"]
+        if event["type"] == "customer.subscription.deleted":
+            deleted_ids.add(obj["id"])
+            updates.pop(obj["id"], None)
+        elif event["type"] == "customer.subscription.updated":
+            if obj["id"] not in deleted_ids:
+                updates[obj["id"]] = obj
+        else:
+            # Shouldn't happen for BATCHED_EVENT_TYPES, but don't drop it
+            _handle_stripe_event(event["type"], obj)
+
+    if updates:
+        # One SELECT for the whole window, one multi-row UPDATE back
+        subscriptions = list(
+            Subscription.objects.filter(stripe_subscription_id__in=updates)
+            .only('id', 'stripe_subscription_id', 'status', 'trial_end_ts', 'current_period_end_ts')
+        )
+        for subscription in subscriptions:
+            obj = updates[subscription.stripe_subscription_id]
+            subscription.status = obj["status"]
+            subscription.trial_end_ts = obj.get("trial_end")
+            subscription.current_period_end_ts = obj.get("current_period_end")
+        Subscription.objects.bulk_update(
+            subscriptions,
+            ['status', 'trial_end_ts', 'current_period_end_ts'],
+            batch_size=500,
+        )
+        logger.info(f"Batch-updated {len(subscriptions)} subscriptions")
+
+    if deleted_ids:
+        canceled = Subscription.objects.filter(
+            stripe_subscription_id__in=deleted_ids
+        ).update(status="canceled")
+        logger.info(f"Batch-canceled {canceled} subscriptions")
+
+    WebhookEvent.objects.filter(
+        event_id__in=[event["id"] for event in events]
+    ).update(processed_at=timezone.now())
+
+    return len(events)
+
+
+@shared_task(bind=True, autoretry_for=(stripe.error.APIConnectionError,), retry_backoff=True, max_retries=3)
+def sync_plan_to_stripe(self, plan_id):
+    """Create the Stripe Product/Price for a plan off the request thread.
+
+    The admin gets the Plan row back immediately with
+    sync_status='pending'; checkout refuses the plan until this lands.
+    """
+    from .cache import invalidate_plan
+
+    plan = Plan.objects.get(pk=plan_id)
+
+    try:
+        product = stripe.Product.create(
+            name=plan.name,
+            description=plan.description or ""
+        )
+        price = stripe.Price.create(
+            product=product.id,
+            unit_amount=plan.amount,
+            currency="usd",
+            recurring={
+                "interval": plan.interval,
+                "interval_count": plan.interval_count,
+            },
+        )
+    except stripe.error.StripeError as e:
+        logger.error(f"Stripe sync failed for plan {plan.pk}: {str(e)}")
+        plan.sync_status = "failed"
+        plan.save(update_fields=['sync_status'])
+        invalidate_plan(plan.pk)
+        raise
+
+    plan.stripe_product_id = product.id
+    plan.stripe_price_id = price.id
+    plan.sync_status = "active"
+    # save() (not .update) so the plan-list cache signal fires
+    plan.save(update_fields=['stripe_product_id', 'stripe_price_id', 'sync_status'])
+    invalidate_plan(plan.pk)
+
+
+@shared_task(bind=True, autoretry_for=(stripe.error.APIConnectionError,), retry_backoff=True, max_retries=3)
+def update_stripe_auto_renew(self, stripe_subscription_id, cancel_at_period_end):
+    """Push an auto-renew toggle to Stripe off the request thread.
+
+    The view already flipped the local flag; the webhook path reconciles
+    whatever state Stripe confirms.
+    """
+    stripe.Subscription.modify(
+        stripe_subscription_id,
+        cancel_at_period_end=cancel_at_period_end,
+    )
+    logger.info(
+        f"Set cancel_at_period_end={cancel_at_period_end} for {stripe_subscription_id}"
+    )
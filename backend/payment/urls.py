@@ -6,6 +6,7 @@ urlpatterns = [
       path("payment-success/", PaymentSuccessView.as_view(), name="payment-success"),
       path("payment-cancel/", PaymentCancelView.as_view(), name="payment-cancel"),
       path("checkout-status/", CheckoutSessionStatusView.as_view(), name="checkout-status"),
+      path("checkout-task/<str:task_id>/", CheckoutTaskStatusView.as_view(), name="checkout-task-status"),
       path("subscription-status/", UserSubscriptionStatusView.as_view(), name="subscription-status"),
       path("webhook/", stripe_webhook, name="stripe-webhook"),
       path("subscriptions/list/", SubscriptionListView.as_view(), name="subscription-list"),
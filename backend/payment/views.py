@@ -1,59 +1,124 @@
 import stripe
 import datetime
+import hashlib
+import hmac
+import json
 import logging
+import time
 from django.conf import settings
-from django.utils.timezone import make_aware
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
 from django.utils import timezone
 from django.views.decorators.csrf import csrf_exempt
 from django.http import HttpResponse
 from rest_framework.views import APIView
 from rest_framework import generics
+from rest_framework.pagination import CursorPagination
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework import permissions
 from django.contrib.auth import get_user_model
 
+from celery.result import AsyncResult
+
+from .cache import get_active_plan, get_cached_plan_list, invalidate_plan
 from .models import *
 from .serializers import *
-import os
-from dotenv import load_dotenv
+from .tasks import (
+    BATCHED_EVENT_TYPES,
+    STRIPE_EVENTS_LIST_KEY,
+    create_stripe_checkout,
+    get_redis_client,
+    process_stripe_event,
+    sync_plan_to_stripe,
+    update_stripe_auto_renew,
+)
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
-load_dotenv()
+stripe.api_key = settings.STRIPE_SECRET_KEY
 
-stripe.api_key = os.getenv("STRIPE_SECRET_KEY")
+# Read once at import time; encoded for the HMAC pre-check below
+_ENDPOINT_SECRET = settings.STRIPE_WEBHOOK_SECRET or ""
+_ENDPOINT_SECRET_BYTES = _ENDPOINT_SECRET.encode()
 
 User = get_user_model()
 
+
+# Same default tolerance the Stripe SDK applies in construct_event
+_SIGNATURE_TOLERANCE = 300
+
+# The only event types _handle_stripe_event acts on; everything else is
+# acked immediately in stripe_webhook
+HANDLED_EVENT_TYPES = frozenset({
+    "checkout.session.completed",
+    "customer.subscription.created",
+    "customer.subscription.updated",
+    "customer.subscription.deleted",
+})
+
+
+def _signature_is_valid(payload, sig_header):
+    """HMAC-SHA256 signature check using the pre-encoded secret bytes.
+
+    construct_event JSON-parses the payload before verifying, so forged
+    requests would pay the parse cost; this rejects them on a single
+    hash. It also enforces the same timestamp tolerance as the SDK, so
+    the webhook view verifies each delivery exactly once.
+    """
+    # Fail closed on a missing secret: an empty HMAC key would let
+    # anyone forge a valid-looking signature
+    if not _ENDPOINT_SECRET_BYTES:
+        logger.error("STRIPE_WEBHOOK_SECRET is not configured; rejecting webhook")
+        return False
+    if not sig_header:
+        return False
+    parts = dict(
+        item.split("=", 1) for item in sig_header.split(",") if "=" in item
+    )
+    timestamp = parts.get("t")
+    signature = parts.get("v1")
+    if not timestamp or not signature:
+        return False
+    try:
+        if abs(time.time() - int(timestamp)) > _SIGNATURE_TOLERANCE:
+            return False
+    except ValueError:
+        return False
+    computed = hmac.new(
+        _ENDPOINT_SECRET_BYTES, f"{timestamp}.".encode() + payload, hashlib.sha256
+    ).hexdigest()
+    return hmac.compare_digest(computed, signature)
+
+# Days per billing interval; month is approximated at 30 days
+# (use dateutil.relativedelta if exact month arithmetic is ever needed)
+_INTERVAL_DAYS = {
+    "day": 1,
+    "week": 7,
+    "month": 30,
+    "year": 365,
+}
+
 def calculate_current_period_end(plan, start_date=None):
     """
     Calculate the current period end date based on plan interval
-    
+
     Args:
         plan: Plan object containing interval and interval_count
         start_date: Starting date (defaults to current time)
-    
+
     Returns:
         datetime: The calculated end date for the current period
     """
     if not start_date:
         start_date = timezone.now()
-    
-    if plan.interval == "day":
-        return start_date + datetime.timedelta(days=plan.interval_count)
-    elif plan.interval == "week":
-        return start_date + datetime.timedelta(weeks=plan.interval_count)
-    elif plan.interval == "month":
-        # For monthly subscriptions, add approximately 30 days per month
-        # You could also use dateutil.relativedelta for more accurate month calculations
-        return start_date + datetime.timedelta(days=30 * plan.interval_count)
-    elif plan.interval == "year":
-        return start_date + datetime.timedelta(days=365 * plan.interval_count)
-    else:
+
+    days = _INTERVAL_DAYS.get(plan.interval)
+    if days is None:
         # Default fallback - 30 days
         return start_date + datetime.timedelta(days=30)
+    return start_date + datetime.timedelta(days=days * plan.interval_count)
 
 def process_referral_benefits(user, subscription):
     """
@@ -69,35 +134,36 @@ def process_referral_benefits(user, subscription):
         # Check if the user was referred by someone
         if user.referred_by:
             try:
-                # Find the referrer
-                referrer = User.objects.get(referral_code=user.referred_by)
-                logger.info(f"Found referrer {referrer.id} for user {user.id}")
-                
                 # Use current time if current_period_end is not available
                 base_time = subscription.current_period_end or timezone.now()
                 logger.info(f"Using base time: {base_time}")
-                
+
                 # Calculate benefit duration (e.g., 30 days from subscription end)
                 benefit_duration = datetime.timedelta(days=30)
-                
-                # Grant benefits to the referrer
-                referrer.is_unlimited = True
-                referrer.package_expiry = base_time + benefit_duration
-                referrer.save()
-                logger.info(f"Granted unlimited access to referrer {referrer.id} until {referrer.package_expiry}")
-                
-                # Grant benefits to the referee (the purchaser)
                 bonus_duration = datetime.timedelta(days=7)
-                user.is_unlimited = True
-                user.package_expiry = base_time + bonus_duration
-                user.save()
-                logger.info(f"Granted bonus unlimited access to referee {user.id} until {user.package_expiry}")
-                
-            except User.DoesNotExist:
-                logger.warning(f"Referrer with code {user.referred_by} not found for user {user.id}")
+
+                # Grant benefits to the referrer without fetching the row;
+                # the rowcount tells us whether the code matched anyone
+                referrer_updated = User.objects.filter(
+                    referral_code=user.referred_by
+                ).update(
+                    is_unlimited=True,
+                    package_expiry=base_time + benefit_duration,
+                )
+
+                if referrer_updated:
+                    # Grant benefits to the referee (the purchaser)
+                    User.objects.filter(pk=user.pk).update(
+                        is_unlimited=True,
+                        package_expiry=base_time + bonus_duration,
+                    )
+                    logger.info(f"Granted referral benefits for code {user.referred_by} and referee {user.id}")
+                else:
+                    logger.warning(f"Referrer with code {user.referred_by} not found for user {user.id}")
+
             except Exception as inner_e:
                 logger.error(f"Error processing referrer benefits: {str(inner_e)}")
-                
+
         else:
             logger.info(f"User {user.id} was not referred by anyone, skipping referral benefits")
             
@@ -109,11 +175,31 @@ def process_referral_benefits(user, subscription):
 class PlanListView(generics.ListAPIView):
     queryset = Plan.objects.all()
     serializer_class = PlanSerializer
+    # The whole response is cached under one key, so it must not vary by
+    # page — plans are a handful of rows, serve them all
+    pagination_class = None
+
+    def list(self, request, *args, **kwargs):
+        # Plans are read-heavy and write-rare: serve the serialized payload
+        # straight from Redis; Plan save/delete signals drop the key
+        return Response(get_cached_plan_list(
+            PLAN_LIST_CACHE_KEY,
+            lambda: super(PlanListView, self).list(request, *args, **kwargs).data,
+        ))
 
 
 class PlanListCreateView(generics.ListCreateAPIView):
     queryset = Plan.objects.filter(active=True)
     serializer_class = PlanSerializer
+    # Cached under a single key like PlanListView — no pagination
+    pagination_class = None
+
+    def list(self, request, *args, **kwargs):
+        # Same pattern as PlanListView, but only active plans
+        return Response(get_cached_plan_list(
+            ACTIVE_PLAN_LIST_CACHE_KEY,
+            lambda: super(PlanListCreateView, self).list(request, *args, **kwargs).data,
+        ))
 
     def create(self, request, *args, **kwargs):
         data = request.data.copy()
@@ -135,28 +221,13 @@ class PlanListCreateView(generics.ListCreateAPIView):
             return Response({"error": "name, interval, amount required"}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            # Create product on Stripe
-            product = stripe.Product.create(
-                name=name,
-                description=description
-            )
-
-            # Create price on Stripe
-            price = stripe.Price.create(
-                product=product.id,
-                unit_amount=amount,
-                currency="usd",
-                recurring={
-                    "interval": interval,
-                    "interval_count": interval_count,
-                },
-            )
-
-            # Save to DB
+            # Save to DB first; the Stripe product/price are created on a
+            # worker so two slow Stripe calls don't block the request
             plan = Plan.objects.create(
                 name=name,
-                stripe_product_id=product.id,
-                stripe_price_id=price.id,
+                stripe_product_id=None,
+                stripe_price_id=None,
+                sync_status="pending",
                 amount=amount,
                 interval=interval,
                 interval_count=interval_count,
@@ -165,11 +236,13 @@ class PlanListCreateView(generics.ListCreateAPIView):
                 active=True,
             )
 
+            invalidate_plan(plan.pk)
+
+            transaction.on_commit(lambda: sync_plan_to_stripe.delay(plan.id))
+
             serializer = self.get_serializer(plan)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
-        except stripe.error.StripeError as e:
-            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
@@ -206,12 +279,15 @@ class PlanUpdateView(generics.RetrieveUpdateAPIView):
                     }
                 )
                 updated_plan.stripe_price_id = new_price.id
-                updated_plan.save()
+                updated_plan.save(update_fields=['stripe_price_id'])
 
         except Exception as e:
             # Log error but don't block update
             print("Stripe update error:", e)
 
+        # Drop the cached copy so checkouts see the new data right away
+        invalidate_plan(updated_plan.pk)
+
 
 class CreateSubscriptionView(APIView):
     def post(self, request):
@@ -226,12 +302,20 @@ class CreateSubscriptionView(APIView):
         )
         
         try:
-            plan = Plan.objects.get(pk=plan_id, active=True)
+            plan = get_active_plan(plan_id)
         except Plan.DoesNotExist:
             return Response({"error": "Plan not found"}, status=404)
 
+        # Plans created via the API sync to Stripe asynchronously; refuse
+        # checkout until the price id has landed
+        if plan.sync_status != "active" or not plan.stripe_price_id:
+            return Response(
+                {"error": "Plan is not available for checkout yet"},
+                status=status.HTTP_409_CONFLICT,
+            )
+
         # Check if user already has an active subscription or trial
-        existing_subscription = Subscription.get_user_active_subscription(request.user)
+        existing_subscription = Subscription.get_user_active_subscription(request.user, request=request)
         
         if existing_subscription:
             error_data = {
@@ -256,91 +340,60 @@ class CreateSubscriptionView(APIView):
             return Response(error_data, status=400)
 
         try:
-            # ✅ Create or get Stripe customer
-            existing_sub = Subscription.objects.filter(user=request.user).first()
-            
-            if existing_sub and existing_sub.stripe_customer_id:
-                # Use existing customer
-                customer_id = existing_sub.stripe_customer_id
-                customer = stripe.Customer.retrieve(customer_id)
-            else:
-                # Create new customer
-                customer = stripe.Customer.create(
-                    email=request.user.email,
-                    name=getattr(request.user, "full_name", None) or request.user.email,
-                    metadata={
-                        "user_id": request.user.id,
-                        "plan_id": plan.id
-                    }
-                )
-
-            # ✅ Prepare subscription_data
-            subscription_data = {
-                "metadata": {
-                    "user_id": request.user.id,
-                    "plan_id": plan.id,
-                }
-            }
-
-            # Only add trial if it's > 0
-            if plan.trial_days and plan.trial_days > 0:
-                subscription_data["trial_period_days"] = plan.trial_days
-
-            # ✅ Create Stripe Checkout Session
-            checkout_session = stripe.checkout.Session.create(
-                customer=customer.id,
-                payment_method_types=['card'],
-                line_items=[{
-                    'price': plan.stripe_price_id,
-                    'quantity': 1,
-                }],
-                mode='subscription',
-                success_url=success_url + '?session_id={CHECKOUT_SESSION_ID}',
-                cancel_url=cancel_url,
-                subscription_data=subscription_data,
-                metadata={
-                    'user_id': request.user.id,
-                    'plan_id': plan.id,
-                },
-                automatic_tax={'enabled': False},  # Optional
-                allow_promotion_codes=True,
-            )
-
             # ✅ Save pending subscription in DB (will be updated by webhook)
             # Calculate initial current_period_end based on plan
             initial_current_period_end = calculate_current_period_end(plan)
-            
+
             subscription = Subscription.objects.create(
                 user=request.user,
                 plan=plan,
-                stripe_customer_id=customer.id,
+                stripe_customer_id=None,  # Will be set by the checkout task
                 stripe_subscription_id=None,  # Will be set by webhook
                 status="pending",  # Will be updated by webhook
-                trial_end=None,  # Will be set by webhook
-                current_period_end=initial_current_period_end,  # Set initial value, will be updated by webhook
+                trial_end_ts=None,  # Will be set by webhook
+                current_period_end_ts=int(initial_current_period_end.timestamp()),  # Will be updated by webhook
+            )
+
+            # The Stripe round-trips (Customer + Checkout Session, ~1s) run
+            # on a dedicated Celery queue; the frontend polls the task id
+            task = create_stripe_checkout.apply_async(
+                args=[subscription.id, success_url, cancel_url],
+                queue=settings.CHECKOUT_CELERY_QUEUE_NAME,
             )
 
             return Response({
-                "checkout_url": checkout_session.url,
-                "checkout_session_id": checkout_session.id,
+                "task_id": task.id,
                 "subscription_id": subscription.id,
                 "plan": plan.name,
                 "trial_days": plan.trial_days if plan.trial_days > 0 else None,
                 "message": (
-                    f"Redirecting to Stripe checkout with {plan.trial_days} days trial period"
+                    f"Preparing Stripe checkout with {plan.trial_days} days trial period"
                     if plan.trial_days > 0 else
-                    "Redirecting to Stripe checkout without trial"
+                    "Preparing Stripe checkout without trial"
                 )
-            }, status=201)
+            }, status=202)
 
-        except stripe.error.StripeError as e:
-            return Response({"error": f"Stripe error: {str(e)}"}, status=400)
         except KeyError as e:
             return Response({"error": f"Missing field: {str(e)}"}, status=400)
         except Exception as e:
             return Response({"error": str(e)}, status=400)
 
 
+class CheckoutTaskStatusView(APIView):
+    """Poll the checkout task until the Stripe session is ready"""
+    def get(self, request, task_id):
+        result = AsyncResult(task_id)
+
+        if result.failed():
+            return Response({"status": "failed", "error": str(result.result)}, status=400)
+        if not result.ready():
+            return Response({"status": result.state.lower()}, status=200)
+
+        payload = {"status": "ready"}
+        payload.update(result.result)
+        return Response(payload, status=200)
+
+
 
 class CheckoutSessionStatusView(APIView):
     """Check the status of a Stripe checkout session"""
@@ -361,7 +414,7 @@ class CheckoutSessionStatusView(APIView):
                 # Update our database subscription
                 user_id = session.metadata.get('user_id')
                 if user_id:
-                    subscription = Subscription.objects.filter(
+                    subscription = Subscription.objects.select_related('plan').filter(
                         user_id=user_id,
                         status='pending'
                     ).first()
@@ -369,13 +422,12 @@ class CheckoutSessionStatusView(APIView):
                     if subscription:
                         subscription.stripe_subscription_id = stripe_subscription.id
                         subscription.status = stripe_subscription.status
-                        subscription.trial_end = make_aware(
-                            datetime.datetime.fromtimestamp(stripe_subscription.trial_end)
-                        ) if stripe_subscription.trial_end else None
-                        subscription.current_period_end = make_aware(
-                            datetime.datetime.fromtimestamp(stripe_subscription.current_period_end)
-                        ) if stripe_subscription.current_period_end else None
-                        subscription.save()
+                        subscription.trial_end_ts = stripe_subscription.trial_end or None
+                        subscription.current_period_end_ts = stripe_subscription.current_period_end or None
+                        subscription.save(update_fields=[
+                            'stripe_subscription_id', 'status',
+                            'trial_end_ts', 'current_period_end_ts', 'updated_at',
+                        ])
                         
                         return Response({
                             "success": True,
@@ -404,7 +456,7 @@ class UserSubscriptionStatusView(APIView):
     """Get current user's subscription status"""
     def get(self, request):
         try:
-            active_subscription = Subscription.get_user_active_subscription(request.user)
+            active_subscription = Subscription.get_user_active_subscription(request.user, request=request)
             
             if not active_subscription:
                 return Response({
@@ -460,7 +512,7 @@ class TestReferralBenefitsView(APIView):
             return Response({"error": "subscription_id is required"}, status=400)
         
         try:
-            subscription = Subscription.objects.get(id=subscription_id)
+            subscription = Subscription.objects.select_related('plan', 'user').get(id=subscription_id)
             
             # Process referral benefits for testing
             process_referral_benefits(subscription.user, subscription)
@@ -512,9 +564,14 @@ class CheckReferralStatusView(APIView):
         """Get current user's referral status"""
         user = request.user
         
-        # Count referrals made by this user
-        referral_count = User.objects.filter(referred_by=user.referral_code).count()
-        
+        # One query for the referred users; plain dicts, no model
+        # instantiation, and the response uses them as-is
+        referred_users = list(
+            User.objects.filter(referred_by=user.referral_code)
+            .values('id', 'email', 'is_active')
+        )
+        referral_count = len(referred_users)
+
         # Get referrer info if user was referred
         referrer = None
         if user.referred_by:
@@ -540,14 +597,7 @@ class CheckReferralStatusView(APIView):
                 "email": referrer.email if referrer else None,
                 "referral_code": referrer.referral_code if referrer else None
             } if referrer else None,
-            "referred_users": [
-                {
-                    "id": ref_user.id,
-                    "email": ref_user.email,
-                    "is_active": ref_user.is_active
-                }
-                for ref_user in User.objects.filter(referred_by=user.referral_code)
-            ]
+            "referred_users": referred_users
         }, status=200)
 
 
@@ -556,216 +606,96 @@ class CheckReferralStatusView(APIView):
 def stripe_webhook(request):
     payload = request.body
     sig_header = request.META.get("HTTP_STRIPE_SIGNATURE")
-    endpoint_secret = os.getenv("STRIPE_WEBHOOK_SECRET")
-    
-    logger.info(f"Webhook received - Signature: {sig_header is not None}, Secret configured: {endpoint_secret is not None}")
 
+    logger.info(f"Webhook received - Signature: {sig_header is not None}, Secret configured: {bool(_ENDPOINT_SECRET)}")
+
+    if not _signature_is_valid(payload, sig_header):
+        logger.error("Webhook signature pre-check failed")
+        return HttpResponse(status=400)
+
+    # _signature_is_valid already did the full HMAC + tolerance check, so
+    # construct_event would only repeat the same hash; a plain parse is
+    # all that's left
     try:
-        event = stripe.Webhook.construct_event(payload, sig_header, endpoint_secret)
+        event = json.loads(payload)
         logger.info(f"Webhook event constructed successfully: {event.get('type', 'unknown')}")
     except ValueError as e:
         logger.error(f"Invalid payload: {str(e)}")
         return HttpResponse(status=400)
-    except stripe.error.SignatureVerificationError as e:
-        logger.error(f"Invalid signature: {str(e)}")
-        return HttpResponse(status=400)
-    except Exception as e:
-        logger.error(f"Webhook construction error: {str(e)}")
-        return HttpResponse(status=400)
+
+    # Stripe emits dozens of event types; ack the ones we don't handle
+    # before spending any DB/broker/cache work on them
+    if event["type"] not in HANDLED_EVENT_TYPES:
+        logger.info(f"Unhandled webhook event type acked: {event['type']}")
+        return HttpResponse(status=200)
+
+    # Redis dedup before touching the DB or broker: cache.add maps to
+    # SET NX EX, so a redelivered event costs one ~1ms round-trip. The
+    # TTL outlives Stripe's 72h retry window.
+    if not cache.add(f"stripe:evt:{event['id']}", "1", timeout=3 * 86400):
+        logger.info(f"Duplicate webhook delivery ignored: {event['id']}")
+        return HttpResponse(status=200)
+
+    if event["type"] in BATCHED_EVENT_TYPES:
+        # High-volume replay types go onto a Redis list and are drained
+        # in bulk by the drain_stripe_events beat task
+        get_redis_client().rpush(STRIPE_EVENTS_LIST_KEY, payload)
+        logger.info(f"Webhook event {event['id']} pushed to batch queue")
+        return HttpResponse(status=200)
 
     try:
-        
+
         WebhookEvent.objects.create(
             event_id=event["id"],
             type=event["type"],
             data=event["data"]["object"],
         )
-        
+
         logger.info(f"Webhook event saved to database: {event['id']}")
+    except IntegrityError:
+        # Stripe redelivered an event we already stored: ack and stop,
+        # the unique event_id makes this branch the dedup point
+        logger.info(f"Duplicate webhook delivery ignored: {event['id']}")
+        return HttpResponse(status=200)
     except Exception as e:
         logger.error(f"Failed to save webhook event: {str(e)}")
         # Don't return error here, continue processing
 
-    obj = event["data"]["object"]
-    event_type = event["type"]
-    
-    logger.info(f"Processing webhook event: {event_type}")
-
-    try:
-        
-        if event_type == "checkout.session.completed":
-            logger.info("Processing checkout.session.completed")
-            
-            # Get user from metadata
-            metadata = obj.get("metadata", {})
-            user_id = metadata.get("user_id")
-            plan_id = metadata.get("plan_id")
-            
-            logger.info(f"Checkout metadata - user_id: {user_id}, plan_id: {plan_id}")
-            
-            if user_id and obj.get("subscription"):
-                try:
-                    # Retrieve the subscription from Stripe
-                    stripe_subscription = stripe.Subscription.retrieve(obj["subscription"])
-                    logger.info(f"Retrieved Stripe subscription: {stripe_subscription.id}")
-                    
-                    # Find the pending subscription by user_id and customer_id instead of stripe_subscription_id
-                    subscription = Subscription.objects.filter(
-                        user_id=user_id,
-                        stripe_customer_id=obj.get("customer"),
-                        status="pending"
-                    ).first()
-                    
-                    if subscription:
-                        # Safely handle timestamps
-                        trial_end = None
-                        current_period_end = None
-                        
-                        if hasattr(stripe_subscription, 'trial_end') and stripe_subscription.trial_end:
-                            trial_end = make_aware(
-                                datetime.datetime.fromtimestamp(stripe_subscription.trial_end)
-                            )
-                        
-                        if hasattr(stripe_subscription, 'current_period_end') and stripe_subscription.current_period_end:
-                            current_period_end = make_aware(
-                                datetime.datetime.fromtimestamp(stripe_subscription.current_period_end)
-                            )
-                        else:
-                            # Fallback: calculate based on plan if Stripe doesn't provide it
-                            if subscription.plan:
-                                current_period_end = calculate_current_period_end(
-                                    subscription.plan, 
-                                    subscription.created_at
-                                )
-                        
-                        subscription.stripe_subscription_id = stripe_subscription.id
-                        subscription.status = stripe_subscription.status
-                        subscription.trial_end = trial_end
-                        subscription.current_period_end = current_period_end
-                        subscription.save()
-                        
-                        logger.info(f"Updated subscription {subscription.id} with Stripe data")
-                        
-                        # Process referral benefits after successful subscription creation
-                        try:
-                            process_referral_benefits(subscription.user, subscription)
-                        except Exception as e:
-                            logger.error(f"Error processing referral benefits: {str(e)}")
-                        
-                    else:
-                        logger.warning(f"No pending subscription found for user {user_id} and customer {obj.get('customer')}")
-                        
-                except Exception as e:
-                    logger.error(f"Error processing checkout.session.completed: {str(e)}")
-
-        elif event_type == "customer.subscription.created":
-            logger.info("Processing customer.subscription.created")
-            
-            try:
-                # First, try to find existing subscription by stripe_subscription_id
-                subscription = Subscription.objects.filter(stripe_subscription_id=obj["id"]).first()
-                
-                if not subscription:
-                    # If not found, try to find by customer_id and status
-                    subscription = Subscription.objects.filter(
-                        stripe_customer_id=obj.get("customer"),
-                        status="pending"
-                    ).first()
-                
-                if subscription:
-                    # Update existing subscription
-                    trial_end = None
-                    current_period_end = None
-                    
-                    if obj.get("trial_end"):
-                        trial_end = make_aware(
-                            datetime.datetime.fromtimestamp(obj["trial_end"])
-                        )
-                    
-                    if obj.get("current_period_end"):
-                        current_period_end = make_aware(
-                            datetime.datetime.fromtimestamp(obj["current_period_end"])
-                        )
-                    
-                    subscription.stripe_subscription_id = obj["id"]
-                    subscription.status = obj["status"]
-                    subscription.trial_end = trial_end
-                    subscription.current_period_end = current_period_end
-                    subscription.save()
-                    
-                    logger.info(f"Updated existing subscription {subscription.id} with Stripe ID: {obj['id']}")
-                else:
-                    logger.warning(f"No matching subscription found for Stripe subscription {obj['id']}")
-                
-            except Exception as e:
-                logger.error(f"Error processing customer.subscription.created: {str(e)}")
-
-        # ✅ Handle subscription updated
-        elif event_type == "customer.subscription.updated":
-            logger.info("Processing customer.subscription.updated")
-            
-            try:
-                # Safely handle timestamps
-                trial_end = None
-                current_period_end = None
-                
-                if obj.get("trial_end"):
-                    trial_end = make_aware(
-                        datetime.datetime.fromtimestamp(obj["trial_end"])
-                    )
-                
-                if obj.get("current_period_end"):
-                    current_period_end = make_aware(
-                        datetime.datetime.fromtimestamp(obj["current_period_end"])
-                    )
-                
-                updated_count = Subscription.objects.filter(
-                    stripe_subscription_id=obj["id"]
-                ).update(
-                    status=obj["status"],
-                    trial_end=trial_end,
-                    current_period_end=current_period_end,
-                )
-                
-                logger.info(f"Updated {updated_count} subscriptions for Stripe ID: {obj['id']}")
-                
-            except Exception as e:
-                logger.error(f"Error processing customer.subscription.updated: {str(e)}")
-
-        # ✅ Handle subscription deleted/cancelled
-        elif event_type == "customer.subscription.deleted":
-            logger.info("Processing customer.subscription.deleted")
-            
-            try:
-                updated_count = Subscription.objects.filter(
-                    stripe_subscription_id=obj["id"]
-                ).update(status="canceled")
-                
-                logger.info(f"Canceled {updated_count} subscriptions for Stripe ID: {obj['id']}")
-                
-            except Exception as e:
-                logger.error(f"Error processing customer.subscription.deleted: {str(e)}")
-        
-        else:
-            logger.info(f"Unhandled webhook event type: {event_type}")
-
-    except Exception as e:
-        logger.error(f"Error processing webhook event {event_type}: {str(e)}")
-        return HttpResponse(status=500)
+    # Everything else (Stripe retrievals, DB writes, referral benefits)
+    # happens on the webhook worker; Stripe just needs the 2xx
+    process_stripe_event.apply_async(
+        args=[event["id"]],
+        queue=settings.WEBHOOK_CELERY_QUEUE_NAME,
+    )
 
-    logger.info(f"Webhook processing completed successfully for event: {event_type}")
+    logger.info(f"Webhook event {event['id']} queued for processing")
     return HttpResponse(status=200)
 
 
+class SubscriptionCursorPagination(CursorPagination):
+    # Cursor pagination: no COUNT(*) per page, and deep pages don't pay
+    # the growing OFFSET scan a page-number paginator would
+    ordering = '-created_at'
+    page_size = 50
+
 
 class SubscriptionListView(generics.ListAPIView):
     """List all subscriptions (admin only)"""
-    queryset = Subscription.objects.all().order_by('-created_at')
+    queryset = Subscription.objects.select_related('user', 'plan').order_by('-created_at')
     serializer_class = SubscriptionSerializer
+    pagination_class = SubscriptionCursorPagination
     # permission_classes = [permissions.IsAdminUser]
-    # pagination_class = None  # Disable pagination for simplicity
-    
-    
+
+    def list(self, request, *args, **kwargs):
+        # Subscriptions change more often than plans, so keep the TTL short
+        key = f"subs:{request.user.pk}:{request.query_params.get('cursor', '')}"
+        cached = cache.get(key)
+        if cached is not None:
+            return Response(cached)
+        data = super().list(request, *args, **kwargs).data
+        cache.set(key, data, 60)
+        return Response(data)
+
 
 class SubscriptionStopAutoRenewalView(APIView):
     permission_classes = [permissions.IsAuthenticated]
@@ -773,7 +703,7 @@ class SubscriptionStopAutoRenewalView(APIView):
     def post(self, request):
         
         try:
-            active_subscription = Subscription.get_user_active_subscription(request.user)
+            active_subscription = Subscription.get_user_active_subscription(request.user, request=request)
             request_auto_renew = request.data.get("auto_renew", False)
             
             if not active_subscription or not active_subscription.stripe_subscription_id:
@@ -781,14 +711,14 @@ class SubscriptionStopAutoRenewalView(APIView):
             
             # The request parameter indicates what the user wants auto_renew to be set to
             if request_auto_renew == False:
-                # User wants to stop auto-renewal
-                stripe.Subscription.modify(
-                    active_subscription.stripe_subscription_id,
-                    cancel_at_period_end=True
-                )
-
+                # User wants to stop auto-renewal. The local flag flips
+                # now; the Stripe modify call runs on a worker and the
+                # webhook reconciles whatever Stripe confirms
+                Subscription.objects.filter(pk=active_subscription.pk).update(auto_renew=False)
                 active_subscription.auto_renew = False
-                active_subscription.save()
+                update_stripe_auto_renew.delay(
+                    active_subscription.stripe_subscription_id, True
+                )
                 return Response({
                     "message": "Auto-renewal stopped. Subscription will cancel at the end of the current period",
                     "subscription": {
@@ -796,17 +726,15 @@ class SubscriptionStopAutoRenewalView(APIView):
                         "auto_renew": active_subscription.auto_renew,
                         "current_period_end": active_subscription.current_period_end
                     }
-                }, status=200)
+                }, status=202)
             else:
                 # User wants to enable auto-renewal
-                stripe.Subscription.modify(
-                    active_subscription.stripe_subscription_id,
-                    cancel_at_period_end=False
+                Subscription.objects.filter(pk=active_subscription.pk).update(auto_renew=True)
+                active_subscription.auto_renew = True
+                update_stripe_auto_renew.delay(
+                    active_subscription.stripe_subscription_id, False
                 )
 
-                active_subscription.auto_renew = True
-                active_subscription.save()
-            
                 return Response({
                     "message": "Auto-renewal enabled. Subscription will continue at the end of the current period",
                     "subscription": {
@@ -814,8 +742,8 @@ class SubscriptionStopAutoRenewalView(APIView):
                         "auto_renew": active_subscription.auto_renew,
                         "current_period_end": active_subscription.current_period_end
                     }
-                }, status=200)
-            
+                }, status=202)
+
         except stripe.error.StripeError as e:
             logger.error(f"Stripe error in stop auto-renewal: {str(e)}")
             return Response({"error": f"Stripe error: {str(e)}"}, status=400)
@@ -97,7 +97,12 @@ DATABASES = {
     }
 }
 
-# PostgreSQL or other database configuration
+# PostgreSQL or other database configuration. In production, point
+# DATABASE_HOST/PORT at PgBouncer (pool_mode=transaction,
+# default_pool_size=25, max_client_conn=1000) rather than Postgres
+# itself — web, webhook and Celery processes then share a small set of
+# server backends. With transaction pooling set DB_CONN_MAX_AGE=0 so
+# Django hands connections back per request.
 # DATABASES = {
 #         'default': {
 #             'ENGINE': DATABASE_ENGINE,
@@ -105,10 +110,19 @@ DATABASES = {
 #             'USER': os.getenv('DATABASE_USER'),
 #             'PASSWORD': os.getenv('DATABASE_PASSWORD'),
 #             'HOST': os.getenv('DATABASE_HOST', '127.0.0.1'),
-#             'PORT': os.getenv('DATABASE_PORT', '5432'),
+#             'PORT': os.getenv('DATABASE_PORT', '6432'),
+#             'OPTIONS': {
+#                 'connect_timeout': 2,
+#                 'options': '-c statement_timeout=15000',
+#             },
 #         }
 #     }
 
+# Reuse DB connections across requests instead of reconnecting each time.
+# Behind PgBouncer's transaction pooling this should be 0 (see above).
+DATABASES['default']['CONN_MAX_AGE'] = int(os.getenv('DB_CONN_MAX_AGE', '600'))
+DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -179,6 +193,11 @@ REST_FRAMEWORK = {
     # Pagination settings
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,  # default items per page
+
+    # Throttling (rates live in the Redis cache)
+    'DEFAULT_THROTTLE_RATES': {
+        'otp': os.getenv('OTP_THROTTLE_RATE', '5/min'),
+    },
 }
 
 
@@ -279,6 +298,14 @@ SOCIALACCOUNT_ADAPTER = 'accounts.adapter.MySocialAccountAdapter'
 CELERY_BROKER_URL = os.getenv('CELERY_BROKER_URL', 'redis://127.0.0.1:6379/0')
 CELERY_RESULT_BACKEND = os.getenv('CELERY_RESULT_BACKEND', 'redis://127.0.0.1:6379/0')
 
+# Redis cache (same instance as the Celery broker, separate DB)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.getenv('REDIS_CACHE_URL', 'redis://127.0.0.1:6379/1'),
+    }
+}
+
 # for Google OAuth (social login)
 GOOGLE_CLIENT_ID = os.getenv('GOOGLE_CLIENT_ID')
 GOOGLE_CLIENT_SECRET = os.getenv('GOOGLE_CLIENT_SECRET')
@@ -291,6 +318,37 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 
+# Keep I/O-bound auth emails off the default queue (see the email_worker
+# service in docker-compose.yml for the gevent worker that consumes it)
+# Stripe keys, loaded once here; payment modules read these instead of
+# calling os.getenv themselves
+STRIPE_SECRET_KEY = os.getenv('STRIPE_SECRET_KEY')
+STRIPE_WEBHOOK_SECRET = os.getenv('STRIPE_WEBHOOK_SECRET')
+
+CHECKOUT_CELERY_QUEUE_NAME = os.getenv('CHECKOUT_CELERY_QUEUE_NAME', 'checkout')
+WEBHOOK_CELERY_QUEUE_NAME = os.getenv('WEBHOOK_CELERY_QUEUE_NAME', 'stripe_webhooks')
+
+CELERY_BEAT_SCHEDULE = {
+    # Drain batched Stripe webhook payloads (subscription updated/deleted)
+    'drain-stripe-events': {
+        'task': 'payment.tasks.drain_stripe_events',
+        'schedule': 5.0,
+        'options': {'queue': WEBHOOK_CELERY_QUEUE_NAME},
+    },
+}
+
+CELERY_TASK_ROUTES = {
+    'accounts.celery_task.Celery_send_mail': {'queue': 'email_queue'},
+    # I/O-heavy Stripe work gets its own queues so webhook replay bursts
+    # and slow checkout calls don't starve the email workers
+    'payment.tasks.create_stripe_checkout': {'queue': CHECKOUT_CELERY_QUEUE_NAME},
+    'payment.tasks.sync_plan_to_stripe': {'queue': CHECKOUT_CELERY_QUEUE_NAME},
+    'payment.tasks.update_stripe_auto_renew': {'queue': CHECKOUT_CELERY_QUEUE_NAME},
+    'payment.tasks.process_stripe_event': {'queue': WEBHOOK_CELERY_QUEUE_NAME},
+    'payment.tasks.process_referral_benefits_task': {'queue': WEBHOOK_CELERY_QUEUE_NAME},
+    'payment.tasks.drain_stripe_events': {'queue': WEBHOOK_CELERY_QUEUE_NAME},
+}
+
 USE_TZ = True
 TIME_ZONE = 'Asia/Dhaka'
 
@@ -27,6 +27,11 @@ class CategoryAdmin(admin.ModelAdmin):
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
     list_display = ['name', 'category', 'price', 'discount_price', 'stock', 'is_active', 'created_at']
+
+    def get_queryset(self, request):
+        # One join instead of a category SELECT per row
+        return super().get_queryset(request).select_related('category')
+
     list_filter = ['category', 'is_active', 'created_at', 'type_of_product']
     search_fields = ['name', 'description', 'type_of_product']
     list_editable = ['price', 'discount_price', 'stock', 'is_active']
@@ -63,6 +68,10 @@ class ProductAdmin(admin.ModelAdmin):
 @admin.register(Review)
 class ReviewAdmin(admin.ModelAdmin):
     list_display = ['product', 'user', 'rating', 'created_at']
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('user', 'product', 'product__category')
+
     list_filter = ['rating', 'created_at', 'product__category']
     search_fields = ['product__name', 'user__email', 'comment']
     readonly_fields = ['created_at', 'updated_at']
@@ -82,6 +91,10 @@ class ReviewAdmin(admin.ModelAdmin):
 @admin.register(Cart)
 class CartAdmin(admin.ModelAdmin):
     list_display = ['user', 'product', 'quantity', 'get_total_price_display', 'added_at']
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('user', 'product', 'product__category')
+
     list_filter = ['added_at', 'product__category']
     search_fields = ['user__email', 'product__name']
     readonly_fields = ['added_at', 'updated_at', 'get_total_price_display']
@@ -122,6 +135,11 @@ class OrderAdmin(admin.ModelAdmin):
     readonly_fields = ['created_at', 'updated_at', 'total']
     ordering = ['-created_at']
     inlines = [OrderDetailInline]
+
+    def get_queryset(self, request):
+        # The change page renders the detail inline rows too
+        return super().get_queryset(request).select_related('user').prefetch_related('order_details__product')
+
     
     fieldsets = (
         ('Order Information', {
@@ -163,6 +181,10 @@ class OrderDetailAdmin(admin.ModelAdmin):
     search_fields = ['order__id', 'product__name']
     readonly_fields = ['get_total_price']
     ordering = ['-order__created_at']
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('order', 'product', 'product__category')
+
     
     def get_total_price(self, obj):
         return f"${obj.quantity * obj.price:.2f}"
@@ -1,10 +1,29 @@
+from django.conf import settings
 from django.db import models
+from django.db.models import Avg, Case, Count, DecimalField, F, Q, When
+from django.db.models.functions import Lower
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.functional import cached_property
 from django.utils.text import slugify
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
 
+# Product name search uses name__icontains, which is a sequential scan
+# without a trigram index. The GIN index only exists on Postgres (and
+# needs `CREATE EXTENSION IF NOT EXISTS pg_trgm;` in the migration), so
+# it's appended conditionally — on the default sqlite setup the list
+# stays as-is.
+_PRODUCT_SEARCH_INDEXES = []
+if settings.DATABASES['default']['ENGINE'].endswith('postgresql'):
+    from django.contrib.postgres.indexes import GinIndex
+
+    _PRODUCT_SEARCH_INDEXES.append(
+        GinIndex(name='product_name_trgm', fields=['name'], opclasses=['gin_trgm_ops'])
+    )
+
 class Category(models.Model):
     name = models.CharField(max_length=100, unique=True)
     description = models.TextField(blank=True, null=True)
@@ -18,6 +37,10 @@ class Category(models.Model):
     class Meta:
         verbose_name_plural = 'Categories'
         ordering = ['name']
+        indexes = [
+            # Functional index so the iexact name filter can seek
+            models.Index(Lower('name'), name='category_lower_name_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -35,13 +58,41 @@ class Product(models.Model):
     price = models.DecimalField(max_digits=10, decimal_places=2, default=0.0)
     discount_price = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True, default=0.0)
     type_of_product = models.CharField(max_length=200)
+    # Stored generated column: the "discount if set else price" pick,
+    # computed by the database on write. discount_price defaults to 0
+    # (not NULL), so this is a zero check rather than Coalesce
+    effective_price = models.GeneratedField(
+        expression=Case(
+            When(discount_price__gt=0, then=F('discount_price')),
+            default=F('price'),
+        ),
+        output_field=DecimalField(max_digits=10, decimal_places=2),
+        db_persist=True,
+    )
     stock = models.PositiveIntegerField(default=0)
+    # Denormalized review stats, kept fresh by the Review signals below —
+    # list pages read these columns instead of aggregating per request
+    review_count = models.PositiveIntegerField(default=0)
+    average_rating = models.DecimalField(max_digits=3, decimal_places=2, default=0)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Public list: WHERE is_active ORDER BY created_at DESC.
+            # Partial on is_active so the index only carries sellable
+            # rows and the page is a pure range scan
+            models.Index(
+                fields=['-created_at'],
+                condition=Q(is_active=True),
+                name='prod_active_recent_idx',
+            ),
+            models.Index(fields=['type_of_product'], name='prod_type_idx'),
+            # Sorting/filtering by the real selling price is an index scan
+            models.Index(fields=['effective_price'], name='prod_effective_price_idx'),
+        ] + _PRODUCT_SEARCH_INDEXES
 
     def __str__(self):
         return self.name
@@ -51,6 +102,14 @@ class Product(models.Model):
             return round(((self.price - self.discount_price) / self.price) * 100, 2)
         return 0
 
+    @cached_property
+    def image1_url(self):
+        # Computed at most once per instance; skips the storage .url()
+        # call entirely (per-row signer work on S3-style backends) when
+        # no file is set
+        f = self.image1
+        return f.url if f and f.name else None
+
 
 class Review(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='reviews')
@@ -62,9 +121,32 @@ class Review(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at'], name='review_created_idx'),
+            # Per-product review pages: WHERE product ORDER BY created_at DESC
+            models.Index(fields=['product', '-created_at'], name='review_product_created_idx'),
+        ]
+        constraints = [
+            # One review per user per product, enforced in the DB so
+            # concurrent posts can't slip past an exists() check
+            models.UniqueConstraint(fields=['user', 'product'], name='unique_user_product_review'),
+        ]
 
     def __str__(self):
         return f'Review for {self.product.name} by {self.user}'
+
+
+@receiver([post_save, post_delete], sender=Review)
+def refresh_product_review_stats(sender, instance, **kwargs):
+    # Recompute rather than F()-increment: one grouped aggregate per
+    # review write is cheap and can't drift
+    stats = Review.objects.filter(product_id=instance.product_id).aggregate(
+        count=Count('id'), avg=Avg('rating')
+    )
+    Product.objects.filter(pk=instance.product_id).update(
+        review_count=stats['count'],
+        average_rating=stats['avg'] or 0,
+    )
     
     
 class Cart(models.Model):
@@ -83,8 +165,7 @@ class Cart(models.Model):
     
     def get_total_price(self):
         """Calculate total price for this cart item"""
-        price = self.product.discount_price if self.product.discount_price else self.product.price
-        return price * self.quantity
+        return self.product.effective_price * self.quantity
     
     
 class Order(models.Model):
@@ -1,5 +1,6 @@
 from rest_framework import serializers
-from django.db.models import Avg
+from django.db import connection, transaction
+from django.db.models import Prefetch
 from .models import *
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -11,7 +12,11 @@ class CategorySerializer(serializers.ModelSerializer):
         
     def to_representation(self, instance):
         representation = super().to_representation(instance)
-        representation['productCount'] = instance.products.count()
+        # Annotated by the category views; bare instances still count
+        product_count = getattr(instance, 'productCount', None)
+        if product_count is None:
+            product_count = instance.products.count()
+        representation['productCount'] = product_count
         return representation
         
 
@@ -25,22 +30,56 @@ class CreateProductSerializer(serializers.ModelSerializer):
 
         
 class ProductListSerializer(serializers.ModelSerializer):
-    
+
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        """Attach everything this serializer reads to one query.
+
+        Same pattern as UserSerializer: the joins, the review prefetch
+        and the .only() column list live next to the fields that consume
+        them, so the view can't drift out of sync with the serializer.
+        """
+        return queryset.select_related('category').prefetch_related(
+            Prefetch('reviews', queryset=Review.objects.only('id', 'rating', 'comment', 'product_id'))
+        ).only(
+            'id', 'name', 'image1', 'price', 'stock', 'discount_price',
+            'type_of_product', 'review_count', 'average_rating',
+            'is_active', 'created_at', 'updated_at',
+            'category__id', 'category__name',
+        )
+
     class Meta:
         model = Product
-        fields = ['id', 'category', 'name', 'description', 'image1', 'image2', 'image3', 'price','stock', 'discount_price', 'type_of_product', 'is_active', 'created_at', 'updated_at']
+        # List rows skip the heavy columns (description, extra images);
+        # ProductDetailSerializer below carries the full set
+        fields = ['id', 'category', 'name', 'image1', 'price','stock', 'discount_price', 'type_of_product', 'is_active', 'created_at', 'updated_at']
         read_only_fields = ['id', 'created_at', 'updated_at']
-        
+
     def to_representation(self, instance):
         representation = super().to_representation(instance)
         representation['discount_percentage'] = instance.get_discount_percentage()
         representation['category'] = instance.category.name if instance.category else None
-        representation['total_reviews'] = instance.reviews.count()
-        representation['average_rating'] = instance.reviews.aggregate(avg_rating=Avg('rating'))['avg_rating'] or 0.0
-        representation['reviews'] = SimpleReviewSerializer(instance.reviews.all(), many=True).data
+        # Denormalized columns kept fresh by the Review signals — no
+        # per-request aggregation
+        representation['total_reviews'] = instance.review_count
+        representation['average_rating'] = float(instance.average_rating)
+        # Plain dicts off the prefetch cache — calling .values() here
+        # would bypass the cache and re-query per product, and a nested
+        # serializer pays field-binding overhead per review for a
+        # three-field payload
+        representation['reviews'] = [
+            {'id': review.id, 'rating': review.rating, 'comment': review.comment}
+            for review in instance.reviews.all()
+        ]
 
         return representation
-    
+
+
+class ProductDetailSerializer(ProductListSerializer):
+
+    class Meta(ProductListSerializer.Meta):
+        fields = ['id', 'category', 'name', 'description', 'image1', 'image2', 'image3', 'price','stock', 'discount_price', 'type_of_product', 'is_active', 'created_at', 'updated_at']
+
 
 class SimpleReviewSerializer(serializers.ModelSerializer):
     class Meta:
@@ -56,6 +95,23 @@ class ReviewSerializer(serializers.ModelSerializer):
         
 
 
+class CartLineSerializer(serializers.Serializer):
+    """Read-only cart line shape for CartView.list.
+
+    Reads the SQL-annotated line_total and the joined product row, so
+    serializing a line is pure attribute access.
+    """
+    id = serializers.IntegerField(read_only=True)
+    product = serializers.CharField(source='product.name', read_only=True)
+    product_image = serializers.CharField(source='product.image1_url', read_only=True)
+    quantity = serializers.IntegerField(read_only=True)
+    unite_price = serializers.SerializerMethodField()
+    total_price = serializers.DecimalField(source='line_total', max_digits=12, decimal_places=2, read_only=True, coerce_to_string=False)
+
+    def get_unite_price(self, obj):
+        return obj.product.effective_price
+
+
 class CartSerializer(serializers.ModelSerializer):
     product_name = serializers.ReadOnlyField(source='product.name')
     total_price = serializers.SerializerMethodField()
@@ -66,7 +122,11 @@ class CartSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'user', 'added_at', 'updated_at', 'product_name', 'total_price']
 
     def get_total_price(self, obj):
-        return obj.get_total_price()
+        # Annotated by CartView's queryset; bare instances compute it
+        line_total = getattr(obj, 'line_total', None)
+        if line_total is None:
+            line_total = obj.get_total_price()
+        return line_total
     
 
 
@@ -107,32 +167,41 @@ class CreateOrderSerializer(serializers.ModelSerializer):
     
     def create(self, validated_data):
         user = self.context['request'].user
-        cart_items = Cart.objects.filter(user=user)
-        
-        # total calculation
-        total_amount = 0
-        for item in cart_items:
-            price = item.product.discount_price if item.product.discount_price else item.product.price
-            total_amount += price * item.quantity
-        
-        # create order
-        order = Order.objects.create(
-            user=user,
-            total=total_amount,
-            shipping_address=validated_data.get('shipping_address'),
-            notes=validated_data.get('notes', '')
-        )
-        
-        # create order details
-        for item in cart_items:
-            price = item.product.discount_price if item.product.discount_price else item.product.price
-            OrderDetail.objects.create(
-                order=order,
-                product=item.product,
-                quantity=item.quantity,
-                price=price
+
+        with transaction.atomic():
+            # One SELECT with the product rows joined; each line's price
+            # is resolved once instead of lazy-loading product twice per
+            # item. Locking the cart rows stops a double-submit from
+            # creating two orders off the same cart
+            cart_queryset = Cart.objects.filter(user=user).select_related('product')
+            if connection.features.has_select_for_update:
+                cart_queryset = cart_queryset.select_for_update(of=('self',))
+            cart_items = list(cart_queryset)
+            prices = [(item, item.product.effective_price) for item in cart_items]
+            total_amount = sum(price * item.quantity for item, price in prices)
+
+            # create order
+            order = Order.objects.create(
+                user=user,
+                total=total_amount,
+                shipping_address=validated_data.get('shipping_address'),
+                notes=validated_data.get('notes', '')
             )
-        
-        cart_items.delete()
-        
+
+            # one multi-row INSERT instead of one per cart line
+            OrderDetail.objects.bulk_create(
+                [
+                    OrderDetail(
+                        order=order,
+                        product=item.product,
+                        quantity=item.quantity,
+                        price=price
+                    )
+                    for item, price in prices
+                ],
+                batch_size=500,
+            )
+
+            Cart.objects.filter(user=user).delete()
+
         return order
\ No newline at end of file
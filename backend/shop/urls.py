@@ -9,7 +9,7 @@ urlpatterns = [
     # product URLs can be added later as needed
     path('products/create/', ProductCreateView.as_view(), name='product-create'),
     path('products/list/', ProductListView.as_view(), name='product-list'),
-    path('products/list/admin/', ProductListView.as_view(), name='product-list'),
+    path('products/list/admin/', AdminProductListView.as_view(), name='product-list-admin'),
     path('products/<int:id>/', ProductDetailView.as_view(), name='product-detail'),
     
     # Review URLs can be added later as needed
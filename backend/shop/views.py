@@ -1,7 +1,11 @@
+from django.db import IntegrityError
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Prefetch
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
+from django.http import StreamingHttpResponse
 from django.shortcuts import render
+from rest_framework.renderers import JSONRenderer
 from rest_framework import generics
 from rest_framework import status
 from .serializers import *
@@ -9,7 +13,8 @@ from .models import *
 
 # Create your views here.
 class CategoryCreateListView(generics.ListCreateAPIView):
-    queryset = Category.objects.all()
+    # One grouped COUNT instead of a COUNT(*) per category row
+    queryset = Category.objects.annotate(productCount=Count('products'))
     serializer_class = CategorySerializer
     
 class CategoryDashboardView(generics.ListAPIView):
@@ -29,7 +34,7 @@ class CategoryDashboardView(generics.ListAPIView):
     
     
 class CategoryDetailView(generics.RetrieveUpdateDestroyAPIView):
-    queryset = Category.objects.all()
+    queryset = Category.objects.annotate(productCount=Count('products'))
     serializer_class = CategorySerializer
     lookup_field = 'id'
     
@@ -68,25 +73,64 @@ class ProductListView(generics.ListAPIView):
     ordering = ['-created_at']
     permission_classes = [AllowAny]
     
+    # Overridden by the admin subclass; saves re-parsing the URL path
+    # per request just to pick a base queryset
+    include_inactive = False
+
     def get_queryset(self):
-        # Detect which URL is hit
-        is_admin_path = self.request.path.endswith('/admin/')
-        
-        queryset = Product.objects.all() if is_admin_path else Product.objects.filter(is_active=True)
+        queryset = Product.objects.all() if self.include_inactive else Product.objects.filter(is_active=True)
 
+        # Joins, review prefetch and the .only() column whitelist live on
+        # the serializer, next to the fields that read them
+        queryset = ProductListSerializer.setup_eager_loading(queryset)
+
+        category_id = self.request.query_params.get('category_id')
         category = self.request.query_params.get('category')
         search = self.request.query_params.get('search')
 
-        if category:
+        if category_id:
+            # Straight seek on the FK column — no join, no LOWER()
+            queryset = queryset.filter(category_id=category_id)
+        elif category:
+            # Name fallback; covered by category_lower_name_idx
             queryset = queryset.filter(category__name__iexact=category)
         if search:
             queryset = queryset.filter(name__icontains=search)
         return queryset
+
+    def list(self, request, *args, **kwargs):
+        # ?export=1 streams the full catalog as one JSON array with
+        # bounded memory; the normal paginated response is unchanged
+        if request.query_params.get('export'):
+            return StreamingHttpResponse(
+                self._export_items(self.get_queryset()),
+                content_type='application/json'
+            )
+        return super().list(request, *args, **kwargs)
+
+    def _export_items(self, queryset):
+        renderer = JSONRenderer()
+        yield b'['
+        # iterator() keeps peak memory at O(chunk) instead of O(rows);
+        # on Postgres this also uses a server-side cursor
+        first = True
+        for product in queryset.iterator(chunk_size=500):
+            chunk = renderer.render(self.get_serializer(product).data)
+            yield chunk if first else b',' + chunk
+            first = False
+        yield b']'
     
 
+class AdminProductListView(ProductListView):
+    include_inactive = True
+
+
 class ProductDetailView(generics.RetrieveUpdateDestroyAPIView):
-    queryset = Product.objects.all()
-    serializer_class = ProductListSerializer
+    # Detail serializer renders the category name and the review list too
+    queryset = Product.objects.select_related('category').prefetch_related(
+        Prefetch('reviews', queryset=Review.objects.only('id', 'rating', 'comment', 'product_id'))
+    )
+    serializer_class = ProductDetailSerializer
     lookup_field = 'id'
     
     def delete(self, request, *args, **kwargs):
@@ -104,10 +148,19 @@ class ProductDetailView(generics.RetrieveUpdateDestroyAPIView):
     
     
 # Review views can be added later as needed
+class ReviewPagination(PageNumberPagination):
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
 class ReviewCreateListView(generics.ListCreateAPIView):
     queryset = Review.objects.all()
     serializer_class = ReviewSerializer
-    
+    # Bounded responses — a well-reviewed product shouldn't return
+    # thousands of rows in one payload
+    pagination_class = ReviewPagination
+
     def get_queryset(self):
         queryset = Review.objects.all()
         product_id = self.request.query_params.get('product', None)
@@ -118,12 +171,13 @@ class ReviewCreateListView(generics.ListCreateAPIView):
 
     def perform_create(self, serializer):
         user = self.request.user
-        product = serializer.validated_data.get('product')
-        # Ensure a user can only review a product once
-        if Review.objects.filter(user=user, product=product).exists():
+        # The unique (user, product) constraint enforces one review per
+        # user — no pre-flight exists() query, no duplicate race
+        try:
+            serializer.save(user=user)
+        except IntegrityError:
             raise serializers.ValidationError("You have already reviewed this product.")
-        serializer.save(user=user)
-        
+
 class ReviewDetailView(generics.RetrieveUpdateDestroyAPIView):
     queryset = Review.objects.all()
     serializer_class = ReviewSerializer
@@ -151,7 +205,18 @@ class CartView(generics.ListCreateAPIView):
 
     def get_queryset(self):
         user = self.request.user
-        return Cart.objects.filter(user=user)
+        # Join the product row and push the line math into SQL; the
+        # discount-vs-price pick now lives in the effective_price
+        # generated column, so the line total is a plain multiply
+        return Cart.objects.filter(user=user).select_related('product').only(
+            'id', 'quantity', 'product__id', 'product__name', 'product__image1',
+            'product__effective_price',
+        ).annotate(
+            line_total=ExpressionWrapper(
+                F('product__effective_price') * F('quantity'),
+                output_field=DecimalField(max_digits=12, decimal_places=2),
+            )
+        )
 
     def perform_create(self, serializer):
         user = self.request.user
@@ -165,29 +230,23 @@ class CartView(generics.ListCreateAPIView):
             defaults={'quantity': quantity}
         )
         if not created:
-            cart_item.quantity += quantity
-            cart_item.save()
-        
+            # DB-side increment: atomic under concurrent add-to-cart and
+            # only touches the quantity column
+            Cart.objects.filter(pk=cart_item.pk).update(quantity=F('quantity') + quantity)
+            cart_item.refresh_from_db(fields=['quantity'])
+
         # Update the serializer instance to point to the cart_item
         serializer.instance = cart_item
 
     def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        
-        # Build cart items manually
-        cart_items = []
-        for item in queryset:
-            cart_items.append({
-                'id': item.id,
-                'product': item.product.name,
-                'product_image': item.product.image1.url if item.product.image1 else None,
-                'quantity': item.quantity,
-                'unite_price': item.product.discount_price if item.product.discount_price else item.product.price,
-                'total_price': item.get_total_price()
-            })
+        # Materialize once; the annotated line_total covers both the
+        # per-item field and the grand total without a second evaluation
+        items = list(self.get_queryset())
+
+        cart_items = CartLineSerializer(items, many=True).data
 
         # Calculate grand total for all cart items
-        grand_total = sum(item.get_total_price() for item in queryset)
+        grand_total = sum(item.line_total for item in items)
 
         return Response({
             'cart_items': cart_items,
@@ -203,7 +262,10 @@ class CartDetailView(generics.RetrieveUpdateDestroyAPIView):
     def get_object(self):
         user = self.request.user
         cart_id = self.kwargs.get('id')
-        return generics.get_object_or_404(Cart, id=cart_id, user=user)
+        # Serializer reads product.name, so join it in the same query
+        return generics.get_object_or_404(
+            Cart.objects.select_related('product'), id=cart_id, user=user
+        )
 
     def delete(self, request, *args, **kwargs):
         instance = self.get_object()
@@ -235,4 +297,8 @@ class OrderListView(generics.ListAPIView):
 
     def get_queryset(self):
         user = self.request.user
-        return Order.objects.filter(user=user)
\ No newline at end of file
+        # Batch-resolve the nested details and their products (one IN
+        # query each) — OrderDetailSerializer reads product.name per line
+        return Order.objects.filter(user=user).select_related('user').prefetch_related(
+            Prefetch('order_details', queryset=OrderDetail.objects.select_related('product'))
+        )
\ No newline at end of file